@@ -6,6 +6,9 @@ class Component(ABC):
         self.package = package
         self.lcsc = lcsc
 
+    # KiCad footprint libraries that packages of this component are matched against.
+    footprint_libraries = []
+
     @property
     @abstractmethod
     def template_name(self):
@@ -20,6 +23,7 @@ class Component(ABC):
 
 class Resistor(Component):
     template_name = "R_Small_US"
+    footprint_libraries = ["Resistor_SMD", "Resistor_THT"]
     def __init__(self, value, tolerance, power, **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -37,6 +41,7 @@ class Resistor(Component):
 
 class Capacitor(Component):
     template_name = "C_Small"
+    footprint_libraries = ["Capacitor_SMD", "Capacitor_THT"]
     def __init__(self, value, voltage, dielectric, **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -54,6 +59,7 @@ class Capacitor(Component):
 
 class Inductor(Component):
     template_name = "L_Small"
+    footprint_libraries = ["Inductor_SMD", "Inductor_THT"]
     def __init__(self, value, current, **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -69,6 +75,7 @@ class Inductor(Component):
 
 class Diode(Component):
     template_name = "D_Small"
+    footprint_libraries = ["Diode_SMD", "Diode_THT"]
     def __init__(self, value="Diode", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -82,6 +89,7 @@ class Diode(Component):
 
 class LED(Component):
     template_name = "LED_Small"
+    footprint_libraries = ["LED_SMD", "LED_THT"]
     def __init__(self, value="LED", color="Red", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -97,6 +105,7 @@ class LED(Component):
 
 class ZenerDiode(Component):
     template_name = "D_Zener_Small"
+    footprint_libraries = ["Diode_SMD", "Diode_THT"]
     def __init__(self, value="Zener", voltage="5.1V", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -112,6 +121,7 @@ class ZenerDiode(Component):
 
 class SchottkyDiode(Component):
     template_name = "D_Schottky_Small"
+    footprint_libraries = ["Diode_SMD", "Diode_THT"]
     def __init__(self, value="Schottky", voltage="40V", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -127,6 +137,7 @@ class SchottkyDiode(Component):
 
 class Polyfuse(Component):
     template_name = "Polyfuse_Small"
+    footprint_libraries = ["Fuse"]
     def __init__(self, value="Polyfuse", current="100mA", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -142,6 +153,7 @@ class Polyfuse(Component):
 
 class FerriteBead(Component):
     template_name = "FerriteBead_Small"
+    footprint_libraries = ["Inductor_SMD", "Inductor_THT"]
     def __init__(self, value="Ferrite Bead", impedance="120-ohm @ 100MHz", **kwargs):
         super().__init__(**kwargs)
         self.value = value
@@ -3,9 +3,18 @@ import pickle
 from rapidfuzz import process, fuzz
 import time
 from .logger import logger
+from .profiler import profiler
+from .history import SelectionHistory
+
+try:
+    import numpy # process.cdist returns numpy arrays
+except ImportError:
+    numpy = None
 
 class FootprintFinder:
     _instance = None
+    # A hot-set match at or above this score is good enough to skip the full search.
+    HOT_SET_CUTOFF = 90
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -21,6 +30,9 @@ class FootprintFinder:
         self.cache_dir = os.path.expanduser("~/.cache/spec_to_symbol")
         self.cache_path = os.path.join(self.cache_dir, "footprints.pkl")
         self.footprints = []
+        self.history = SelectionHistory(os.path.join(self.cache_dir, "selections.json"))
+        self._footprint_set = None
+        self._footprint_set_source = None
         self.initialized = False
 
     def _ensure_cache_dir_exists(self):
@@ -83,12 +95,80 @@ class FootprintFinder:
         self.initialized = True
         logger.info(f"Footprint scan complete. Found {len(self.footprints)} footprints.")
 
-    def find(self, query: str, limit=20):
+    def _hot_candidates(self):
+        """The history's hot set, restricted to footprints present in the current scan."""
+        if self._footprint_set_source is not self.footprints:
+            self._footprint_set = set(self.footprints)
+            self._footprint_set_source = self.footprints
+        return [fp for fp in self.history.hot_set if fp in self._footprint_set]
+
+    def find(self, query: str, limit=20, visible=10):
+        """
+        Returns up to `limit` footprints for a completion list that shows
+        `visible` rows. Frequently chosen footprints are scored first and get a
+        boost, so they surface at the top even when the query is still short;
+        when the best of them is a confident match and they fill the visible
+        rows, the full search over every footprint is skipped.
+        """
         if not self.initialized:
             self.scan()
         if not query or not self.footprints:
             return []
-        results = process.extract(query, self.footprints, scorer=fuzz.WRatio, limit=limit)
-        return [result[0] for result in results]
+        with profiler.span("footprint_find"):
+            scored = {}
+            hot = self._hot_candidates()
+            if hot:
+                best = 0
+                for match, score, _ in process.extract(query, hot, scorer=fuzz.WRatio, limit=limit):
+                    scored[match] = score + self.history.boost(match)
+                    best = max(best, score)
+                if best >= self.HOT_SET_CUTOFF and len(scored) >= min(visible, limit):
+                    return sorted(scored, key=scored.get, reverse=True)
+            for match, score, _ in process.extract(query, self.footprints, scorer=fuzz.WRatio, limit=limit):
+                if match not in scored:
+                    scored[match] = score + self.history.boost(match)
+            results = sorted(scored, key=scored.get, reverse=True)[:limit]
+        return results
+
+    def resolve(self, queries, libraries=None, min_score=0, workers=-1, chunk_size=256):
+        """
+        Resolves many package strings at once, e.g. every row of a BOM import.
+        Duplicate queries are scored only once, against the footprints of the
+        given libraries (all footprints if None), in a single multi-threaded
+        process.cdist call per chunk of queries.
+        Returns {query: (best_footprint, score)}; best_footprint is None when there
+        is nothing to match against or the best score is below min_score.
+        """
+        if not self.initialized:
+            self.scan()
+        queries = list(queries)
+        unique_queries = list(dict.fromkeys(q for q in queries if q))
+        candidates = self.footprints
+        if libraries is not None:
+            prefixes = tuple(f"{library}:" for library in libraries)
+            candidates = [fp for fp in self.footprints if fp.startswith(prefixes)]
+        if not candidates:
+            return {query: (None, 0.0) for query in unique_queries}
+
+        resolved = {}
+        with profiler.span("footprint_resolve"):
+            if numpy is None:
+                logger.warning("numpy is not installed; resolving footprints one query at a time.")
+                for query in unique_queries:
+                    match, score, _ = process.extractOne(query, candidates, scorer=fuzz.WRatio)
+                    resolved[query] = (match if score >= min_score else None, score)
+                return resolved
+
+            # Chunking bounds the score matrix to chunk_size x len(footprints).
+            for start in range(0, len(unique_queries), chunk_size):
+                chunk = unique_queries[start:start + chunk_size]
+                scores = process.cdist(chunk, candidates, scorer=fuzz.WRatio, workers=workers)
+                best = scores.argmax(axis=1)
+                for row, query in enumerate(chunk):
+                    index = int(best[row])
+                    score = float(scores[row, index])
+                    resolved[query] = (candidates[index] if score >= min_score else None, score)
+        logger.info(f"Resolved {len(unique_queries)} unique package queries from {len(queries)} rows.")
+        return resolved
 
 footprint_finder = FootprintFinder()
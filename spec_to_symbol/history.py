@@ -0,0 +1,62 @@
+import json
+import math
+import os
+from .logger import logger
+
+class SelectionHistory:
+    """
+    Persistent counts of how often each footprint was picked from the
+    completion list. The most frequently chosen footprints form a small hot
+    set that FootprintFinder searches first and ranks higher. Picks are
+    only written to disk by flush(), so recording one never blocks the UI.
+    """
+    def __init__(self, path, hot_size=50, boost_weight=5.0, max_boost=15.0):
+        self.path = path
+        self.hot_size = hot_size
+        self.boost_weight = boost_weight
+        self.max_boost = max_boost
+        self.counts = self._load()
+        self.hot_set = self._compute_hot_set()
+        self.dirty = False
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (ValueError, IOError) as e:
+            logger.warning(f"Could not load selection history: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.counts, f)
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            logger.error(f"Failed to save selection history: {e}")
+
+    def _compute_hot_set(self):
+        ranked = sorted(self.counts, key=self.counts.get, reverse=True)
+        return ranked[:self.hot_size]
+
+    def record(self, footprint):
+        self.counts[footprint] = self.counts.get(footprint, 0) + 1
+        self.hot_set = self._compute_hot_set()
+        self.dirty = True
+
+    def flush(self):
+        """Writes the counts to disk if any pick was recorded since the last flush."""
+        if self.dirty:
+            self._save()
+            self.dirty = False
+
+    def boost(self, footprint):
+        """Score bonus added to a footprint's fuzzy score, growing logarithmically with its count."""
+        count = self.counts.get(footprint, 0)
+        if not count:
+            return 0.0
+        return min(self.max_boost, self.boost_weight * math.log1p(count))
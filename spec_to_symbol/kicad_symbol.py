@@ -7,6 +7,7 @@ class KiCadSymbol:
         self.properties = properties_sexp
         self.pins = pins
         self.attributes = attributes
+        self.template_name = template_name
         
         if template_name:
             self.graphics = self._rename_graphics(graphics, template_name, name)
@@ -60,7 +61,8 @@ class KiCadSymbol:
             ]
             self.properties[key] = new_prop
 
-    def ensure_hidden_properties(self):
+    def _unhidden_effects(self):
+        """Yields (key, effects block) for every property other than Reference/Value that is not hidden."""
         for key, prop_sexp in self.properties.items():
             if key in ["Reference", "Value"]:
                 continue
@@ -68,9 +70,21 @@ class KiCadSymbol:
             effects_block = next((item for item in prop_sexp if isinstance(item, list) and item and item[0] == SexpAtom("effects")), None)
             if effects_block is None: continue
 
-            is_hidden = any(isinstance(effect, list) and effect and effect[0] == SexpAtom("hide") for effect in effects_block)
+            # Older formats use a bare `hide` atom instead of `(hide yes)`.
+            is_hidden = any(
+                (isinstance(effect, list) and effect and effect[0] == SexpAtom("hide")) or
+                (isinstance(effect, SexpAtom) and effect == "hide")
+                for effect in effects_block
+            )
             if not is_hidden:
-                effects_block.append([SexpAtom("hide"), SexpAtom("yes")])
+                yield key, effects_block
+
+    def unhidden_properties(self):
+        return [key for key, _ in self._unhidden_effects()]
+
+    def ensure_hidden_properties(self):
+        for _, effects_block in list(self._unhidden_effects()):
+            effects_block.append([SexpAtom("hide"), SexpAtom("yes")])
 
     def to_sexp(self):
         sexp = [SexpAtom("symbol"), self.name]
@@ -0,0 +1,45 @@
+from .sexp_parser import SexpAtom
+
+# File format versions written by each KiCad release.
+KICAD_VERSIONS = {
+    "6": 20211014,
+    "7": 20220914,
+    "8": 20231120,
+    "9": 20241209,
+}
+DEFAULT_KICAD_VERSION = KICAD_VERSIONS["9"]
+
+# KiCad 8 replaced bare `hide` flags with `(hide yes)` and added `exclude_from_sim`.
+BOOLEAN_FLAGS_VERSION = 20231120
+# KiCad 9 added `embedded_fonts` to symbols.
+EMBEDDED_FONTS_VERSION = 20241209
+
+HIDE = SexpAtom("hide")
+
+def convert_sexp(ast, target_version):
+    """
+    Returns a copy of a symbol s-expression rewritten for the target file format
+    version. Only the syntax differences between KiCad 6 and 9 symbol libraries
+    are handled; the input may already be in any of those formats.
+    """
+    if not isinstance(ast, list):
+        return ast
+
+    converted = [ast[0]] if ast else []
+    for item in ast[1:]:
+        if isinstance(item, list) and item:
+            head = item[0]
+            if head == HIDE and target_version < BOOLEAN_FLAGS_VERSION:
+                if len(item) < 2 or item[1] == SexpAtom("yes"):
+                    converted.append(HIDE)
+                continue
+            if head == SexpAtom("exclude_from_sim") and target_version < BOOLEAN_FLAGS_VERSION:
+                continue
+            if head == SexpAtom("embedded_fonts") and target_version < EMBEDDED_FONTS_VERSION:
+                continue
+            converted.append(convert_sexp(item, target_version))
+        elif item == HIDE and isinstance(item, SexpAtom) and target_version >= BOOLEAN_FLAGS_VERSION:
+            converted.append([HIDE, SexpAtom("yes")])
+        else:
+            converted.append(item)
+    return converted
@@ -1,53 +1,526 @@
 from spec_to_symbol.kicad_symbol import KiCadSymbol
 from spec_to_symbol.sexp_parser import parse_sexp, build_sexp, SexpAtom
+from spec_to_symbol.kicad_version import DEFAULT_KICAD_VERSION, convert_sexp
+from spec_to_symbol.logger import logger
+from spec_to_symbol.profiler import profiler
+from collections.abc import MutableMapping
+from contextlib import contextmanager, suppress
+import hashlib
+import json
+import mmap
 import os
+import re
+import stat
+import tempfile
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError: # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+# Strings, comments and symbol heads. Parentheses in the gaps between matches
+# are counted in bulk, so strings and comments never affect the nesting depth.
+_SCAN_RE = re.compile(rb'"(?:\\.|[^"\\])*"|;[^\n]*|\(\s*symbol\s+"((?:\\.|[^"\\])*)"')
+_STRING_RE = re.compile(rb'"(?:\\.|[^"\\])*"')
+# A symbol head can never occur inside a string, since quotes in strings are escaped.
+_SYMBOL_HEAD_RE = re.compile(rb'\(\s*symbol\s+"((?:\\.|[^"\\])*)"')
+_VERSION_RE = re.compile(rb'\(\s*version\s+(\d+)')
+
+# Lock files live in the user's cache rather than next to the libraries.
+LOCK_DIR = os.path.join(os.path.expanduser("~/.cache/spec_to_symbol"), "locks")
+
+@contextmanager
+def _file_lock(path):
+    """Holds an exclusive advisory lock on a file in LOCK_DIR named after path."""
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    key = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()
+    with open(os.path.join(LOCK_DIR, key + ".lock"), "a+") as lock_file:
+        fd = lock_file.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            # msvcrt locks a byte range from the current position and gives up
+            # after ten one-second retries, so keep trying until it succeeds.
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            logger.warning(f"No file locking available; concurrent writes to {path} are not safe.")
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+def _new_file_mode(path):
+    """Permissions a rewritten file should get: those of the file it replaces, else the umask default."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def _stamp(st):
+    """Returns a value that changes whenever the file behind a stat result is rewritten."""
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+class SymbolIndex(MutableMapping):
+    """
+    A mapping of symbol name to KiCadSymbol backed by the byte ranges of the
+    top-level symbols in a library file. Symbols are only parsed when accessed.
+
+    The file is only mapped while it is indexed and inside mapped(); no handle
+    is held in between, so on Windows other processes can still replace it.
+    """
+    def __init__(self):
+        self._spans = {}
+        self._parsed = {}
+        self._removed = set()
+        self._mm = None
+        self.path = None
+        self.stamp = None
+        self.version = None
+
+    def index_file(self, path):
+        """(Re)builds the span index from the file at path."""
+        self.close()
+        self.path = path
+        try:
+            self._index()
+        finally:
+            self.close()
+
+    def _index(self):
+        """Maps the file and rebuilds the span index, leaving the file mapped."""
+        self._spans = {}
+        self.version = None
+        self.stamp = None
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            self.stamp = _stamp(st)
+            if st.st_size == 0:
+                return
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # The header precedes the first symbol, so the format version is near the start.
+        version = _VERSION_RE.search(self._mm, 0, 4096)
+        if version:
+            self.version = int(version.group(1))
+
+        with profiler.span("index_library"):
+            if not self._scan_heads():
+                self._spans = {}
+                self._scan()
+
+    def _scan_heads(self):
+        """
+        Fast indexing for well-formed libraries: only symbol heads are visited in
+        Python, and the nesting depth between them is counted in bulk. A top-level
+        symbol is assumed to end at the last ')' before the next top-level head.
+        Returns False if the file does not fit that layout.
+        """
+        mm = self._mm
+        depth = 0
+        pos = 0
+        open_name = None
+        open_start = None
+
+        for match in _SYMBOL_HEAD_RE.finditer(mm):
+            gap = mm[pos:match.start()]
+            counted = _STRING_RE.sub(b"", gap)
+            depth += counted.count(b"(") - counted.count(b")")
+            if depth == 1:
+                if open_name is not None:
+                    end = pos + len(gap.rstrip())
+                    if mm[end - 1] != 0x29:
+                        return False
+                    self._spans[open_name] = (open_start, end)
+                open_name = match.group(1).decode("utf-8").replace('\\"', '"')
+                open_start = match.start()
+            depth += 1
+            pos = match.end()
+
+        tail = mm[pos:]
+        counted = _STRING_RE.sub(b"", tail)
+        if depth + counted.count(b"(") - counted.count(b")") != 0:
+            return False
+        if open_name is not None:
+            # Drop the library's own closing parenthesis.
+            tail = tail.rstrip()[:-1].rstrip()
+            if not tail.endswith(b")"):
+                return False
+            self._spans[open_name] = (open_start, pos + len(tail))
+        return True
+
+    def _scan(self):
+        """Exact indexing that walks every string and parenthesis of the file."""
+        depth = 0
+        pos = 0
+        open_name = None
+        open_start = None
+
+        def skip_gap(end):
+            nonlocal depth, open_name
+            gap = self._mm[pos:end]
+            if open_name is None or depth - gap.count(b")") > 1:
+                depth += gap.count(b"(") - gap.count(b")")
+                return
+            # The open top-level symbol may close inside this gap; walk it to find where.
+            for offset, char in enumerate(gap):
+                if char == 0x28:
+                    depth += 1
+                elif char == 0x29:
+                    depth -= 1
+                    if depth == 1 and open_name is not None:
+                        self._spans[open_name] = (open_start, pos + offset + 1)
+                        open_name = None
+
+        for match in _SCAN_RE.finditer(self._mm):
+            skip_gap(match.start())
+            pos = match.end()
+            if match.lastindex == 1:
+                if depth == 1:
+                    open_name = match.group(1).decode("utf-8").replace('\\"', '"')
+                    open_start = match.start()
+                depth += 1
+        skip_gap(len(self._mm))
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _map_if_unchanged(self):
+        """Maps the file if it is still the one that was indexed; returns False otherwise."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return self.stamp is None
+        with f:
+            st = os.fstat(f.fileno())
+            if _stamp(st) != self.stamp:
+                return False
+            if st.st_size:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return True
+
+    @contextmanager
+    def mapped(self):
+        """
+        Keeps the file mapped for a batch of accesses; outside of this block each
+        access maps it briefly. If the file was rewritten since it was indexed,
+        it is re-indexed first.
+        """
+        if self._mm is not None or self.path is None:
+            yield
+            return
+        try:
+            if not self._map_if_unchanged():
+                logger.info(f"{self.path} changed on disk since it was indexed, re-indexing.")
+                self._index()
+            yield
+        finally:
+            self.close()
+
+    def raw(self, name):
+        """Returns the original bytes of an unparsed symbol, or None if it has to be serialized."""
+        if name in self._parsed or name in self._removed:
+            return None
+        with self.mapped():
+            if name not in self._spans:
+                return None
+            start, end = self._spans[name]
+            return self._mm[start:end]
+
+    def raw_items(self):
+        """Yields (name, bytes) for every symbol that is still unparsed on disk."""
+        with self.mapped():
+            for name in list(self._spans):
+                raw = self.raw(name)
+                if raw is not None:
+                    yield name, raw
+
+    def sexp(self, name):
+        """Returns the s-expression of a symbol without caching a parsed copy of it."""
+        if name in self._parsed:
+            return self._parsed[name].to_sexp()
+        raw = self.raw(name)
+        if raw is None:
+            raise KeyError(name)
+        with profiler.span("parse_sexp"):
+            return parse_sexp(raw.decode("utf-8"))
+
+    def __getitem__(self, name):
+        if name in self._parsed:
+            return self._parsed[name]
+        raw = None if name in self._removed else self.raw(name)
+        if raw is None:
+            raise KeyError(name)
+        with profiler.span("parse_sexp"):
+            sexp = parse_sexp(raw.decode("utf-8"))
+        with profiler.span("symbol_from_sexp"):
+            symbol = KiCadSymbol.from_sexp(sexp)
+        # Once handed out the symbol may be mutated in place, so it is
+        # serialized from the object from now on.
+        self._parsed[name] = symbol
+        return symbol
+
+    def __setitem__(self, name, symbol):
+        self._removed.discard(name)
+        self._parsed[name] = symbol
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._parsed.pop(name, None)
+        self._removed.add(name)
+
+    def __contains__(self, name):
+        return name not in self._removed and (name in self._parsed or name in self._spans)
+
+    def __iter__(self):
+        for name in self._spans:
+            if name not in self._removed:
+                yield name
+        for name in self._parsed:
+            if name not in self._spans:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
 
 class LibraryManager:
-    def __init__(self, library_path):
+    def __init__(self, library_path, target_version=None):
         self.library_path = library_path
+        self.target_version = target_version
         self.symbols = self._load_library()
 
+    @property
+    def version(self):
+        """The file format version of the library on disk, or None if it does not exist yet."""
+        return self.symbols.version
+
     def _load_library(self):
-        symbols = {}
-        if not os.path.exists(self.library_path):
-            return symbols
-        
-        with open(self.library_path, "r") as f:
-            content = f.read()
-        
-        sexp = parse_sexp(content)
-        for item in sexp:
-            if isinstance(item, list) and item[0] == SexpAtom("symbol"):
-                symbol = KiCadSymbol.from_sexp(item)
-                symbols[symbol.name] = symbol
+        symbols = SymbolIndex()
+        symbols.index_file(self.library_path)
         return symbols
 
     def save_library(self):
         """
         Saves the library to a file with proper KiCad formatting and indentation.
+
+        Symbols are written one at a time in sorted order, in the target_version
+        file format. Without a target_version, an existing library keeps the format
+        it is in and a new one is written in the latest supported format. Symbols that were never touched are copied from their original
+        byte range when the file is already in that format, so memory use does not
+        grow with the size of the library.
+
+        The save holds an advisory lock on the library. If another process saved
+        it since it was loaded, the file is re-indexed first: symbols added
+        elsewhere are kept, while symbols added, accessed or removed here win.
         """
-        # Build the entire library as a nested list, using SexpAtom for keywords.
-        lib_sexp = [
-            SexpAtom('kicad_symbol_lib'),
-            [SexpAtom('version'), SexpAtom('20211014')],
-            [SexpAtom('generator'), 'spec-to-symbol']
-        ]
-        
-        # Add sorted symbols to the library structure
-        sorted_symbols = sorted(self.symbols.values(), key=lambda s: s.name)
-        for symbol in sorted_symbols:
-            lib_sexp.append(symbol.to_sexp())
-
-        # Build the final string from the nested list
-        output = build_sexp(lib_sexp)
+        with profiler.span("save_library"):
+            self._save_library()
 
+    def _save_library(self):
         # Ensure the output directory exists.
         lib_dir = os.path.dirname(self.library_path)
         if lib_dir:
             os.makedirs(lib_dir, exist_ok=True)
 
-        with open(self.library_path, "w") as f:
-            f.write(output)
+        with _file_lock(self.library_path), self.symbols.mapped():
+            # mapped() re-indexes the library if another process saved it since
+            # it was loaded, which merges in the symbols added there.
+            target_version = self.target_version or self.symbols.version or DEFAULT_KICAD_VERSION
+            header = [
+                [SexpAtom('version'), SexpAtom(str(target_version))],
+                [SexpAtom('generator'), 'spec-to-symbol']
+            ]
+
+            # Write to a uniquely named temporary file next to the library; the
+            # original stays mapped while unchanged symbols are copied out of it
+            # and is unmapped before it is replaced.
+            fd, tmp_path = tempfile.mkstemp(dir=lib_dir or ".", prefix=os.path.basename(self.library_path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    os.chmod(tmp_path, _new_file_mode(self.library_path))
+                    f.write(b"(kicad_symbol_lib\n")
+                    for item in header:
+                        f.write(build_sexp(item, 1).encode("utf-8") + b"\n")
+                    same_format = self.symbols.version == target_version
+                    for name in sorted(self.symbols):
+                        raw = self.symbols.raw(name) if same_format else None
+                        if raw is not None:
+                            chunk = b"  " + raw + b"\n"
+                        else:
+                            sexp = convert_sexp(self.symbols.sexp(name), target_version)
+                            with profiler.span("build_sexp"):
+                                chunk = build_sexp(sexp, 1).encode("utf-8") + b"\n"
+                        with profiler.span("disk_write"):
+                            f.write(chunk)
+                    f.write(b")")
+                self.symbols.close()
+                with profiler.span("disk_write"):
+                    os.replace(tmp_path, self.library_path)
+            except BaseException:
+                with suppress(FileNotFoundError):
+                    os.unlink(tmp_path)
+                # The mapping may already be closed; point the index back at the
+                # library that is still on disk.
+                self.symbols.index_file(self.library_path)
+                raise
+
+            # Point the untouched symbols at their new location on disk.
+            self.symbols.index_file(self.library_path)
 
     def add_symbol(self, symbol):
         self.symbols[symbol.name] = symbol
+
+class ShardedLibraryManager:
+    """
+    A library split over several .kicad_sym files in one directory. Symbols are
+    routed to a shard by their template or by the first character of their name.
+    An append-only index records which shard holds each symbol, so a save only
+    rewrites the shards it changed and appends a line per moved or added symbol.
+    The index is compacted once superseded lines outnumber the live ones, which
+    keeps it proportional to the number of symbols rather than to their history.
+    """
+    LAYOUT_NAME = "layout.json"
+    INDEX_NAME = "index.jsonl"
+    SHARD_STRATEGIES = ("template", "prefix")
+
+    def __init__(self, library_dir, shard_by=None, target_version=None):
+        self.library_dir = library_dir
+        self.target_version = target_version
+        self.layout_path = os.path.join(library_dir, self.LAYOUT_NAME)
+        self.index_path = os.path.join(library_dir, self.INDEX_NAME)
+
+        existing = None
+        if os.path.exists(self.layout_path):
+            with open(self.layout_path, "r") as f:
+                existing = json.load(f).get("shard_by")
+        if shard_by is None:
+            shard_by = existing or "template"
+        if shard_by not in self.SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy: {shard_by}")
+        if existing and existing != shard_by:
+            raise ValueError(f"{library_dir} is sharded by {existing}, not {shard_by}")
+        self.shard_by = shard_by
+
+        self._shards = {}
+        self._dirty_shards = set()
+        # Symbols added since the last save, mapped to the shard they were added to.
+        self._pending = {}
+
+    def _read_index(self):
+        """Returns ({symbol name: shard name}, number of lines); later lines override earlier ones."""
+        locations = {}
+        line_count = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        name, shard_name = json.loads(line)
+                        locations[name] = shard_name
+                        line_count += 1
+        return locations, line_count
+
+    def _write_index(self, locations):
+        """Rewrites the index with one line per symbol."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.library_dir, prefix=self.INDEX_NAME + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                os.chmod(tmp_path, _new_file_mode(self.index_path))
+                for name, shard_name in locations.items():
+                    f.write(json.dumps([name, shard_name]) + "\n")
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+    def shard_for(self, symbol):
+        """Returns the shard file name a symbol belongs to."""
+        if self.shard_by == "template":
+            key = symbol.template_name or "Misc"
+        else:
+            first = symbol.name[:1].upper()
+            key = first if first.isalnum() else "_"
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".kicad_sym"
+
+    def _shard(self, shard_name):
+        if shard_name not in self._shards:
+            self._shards[shard_name] = LibraryManager(os.path.join(self.library_dir, shard_name), self.target_version)
+        return self._shards[shard_name]
+
+    def _remove_from_shard(self, name, shard_name):
+        shard = self._shard(shard_name)
+        if name in shard.symbols:
+            del shard.symbols[name]
+        self._dirty_shards.add(shard_name)
+
+    def add_symbol(self, symbol):
+        shard_name = self.shard_for(symbol)
+        previous = self._pending.get(symbol.name)
+        if previous and previous != shard_name:
+            self._remove_from_shard(symbol.name, previous)
+        self._shard(shard_name).add_symbol(symbol)
+        self._pending[symbol.name] = shard_name
+        self._dirty_shards.add(shard_name)
+
+    def save_library(self):
+        """
+        Saves the shards that changed since the last save, then records their new
+        index entries. The whole save holds the index lock and reads the index
+        under it, so a symbol that another writer placed in a different shard in
+        the meantime is moved rather than duplicated.
+        """
+        os.makedirs(self.library_dir, exist_ok=True)
+        if not os.path.exists(self.layout_path):
+            # Other writers may be creating the layout at the same time.
+            fd, tmp_path = tempfile.mkstemp(dir=self.library_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                os.chmod(tmp_path, _new_file_mode(self.layout_path))
+                json.dump({"shard_by": self.shard_by}, f)
+            os.replace(tmp_path, self.layout_path)
+
+        with _file_lock(self.index_path):
+            locations, line_count = self._read_index()
+            new_entries = []
+            for name, shard_name in self._pending.items():
+                previous = locations.get(name)
+                if previous == shard_name:
+                    continue
+                if previous:
+                    self._remove_from_shard(name, previous)
+                locations[name] = shard_name
+                new_entries.append([name, shard_name])
+
+            for shard_name in sorted(self._dirty_shards):
+                self._shards[shard_name].save_library()
+            self._dirty_shards.clear()
+            self._pending.clear()
+
+            if line_count + len(new_entries) > 2 * len(locations):
+                self._write_index(locations)
+            elif new_entries:
+                with open(self.index_path, "a") as f:
+                    for entry in new_entries:
+                        f.write(json.dumps(entry) + "\n")
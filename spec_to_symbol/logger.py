@@ -1,14 +1,82 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 
 log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'debug.log')
 
-# Configure the logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s',
-    filename=log_file,
-    filemode='w' # Overwrite log on each run
-)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(module)s - %(message)s'
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every N records of a category. The category is taken from the
+    record's `category` attribute (pass `extra={"category": ...}` when logging);
+    records without a configured rate always pass.
+    """
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._counts = {}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "category", None), 1)
+        if rate <= 1:
+            return True
+        count = self._counts.get(record.category, 0)
+        self._counts[record.category] = count + 1
+        return count % rate == 0
+
+def _parse_sample_rates(spec):
+    """Parses 'key=10,draw=100' into {'key': 10, 'draw': 100}, skipping malformed entries."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        category, _, rate = part.partition("=")
+        try:
+            rates[category.strip()] = int(rate)
+        except ValueError:
+            logger.warning(f"Ignoring malformed log sample rate {part!r}.")
+    return rates
+
+def _parse_level(name):
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        logger.warning(f"Unknown log level {name!r}, using INFO.")
+        return logging.INFO
+    return level
+
+_listener = None
+_sampling_filter = SamplingFilter()
+
+def configure_logging(level=None, sample_rates=None, max_bytes=1024 * 1024, backup_count=3):
+    """
+    Routes log records through a queue to a background thread that appends to
+    debug.log and rotates it by size, so logging calls never touch the disk on
+    the caller's thread. The first call also reads the level and sample rates
+    from the environment when they are not given; later calls only change what
+    is passed explicitly, so an entry point's --log-level is not reset.
+    """
+    global _listener
+    root = logging.getLogger()
+    first_call = _listener is None
+    if first_call:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(_sampling_filter)
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    if level is not None or first_call:
+        root.setLevel(_parse_level(level or os.environ.get("SPEC_TO_SYMBOL_LOG_LEVEL", "INFO")))
+    if sample_rates is not None or first_call:
+        if sample_rates is None:
+            sample_rates = _parse_sample_rates(os.environ.get("SPEC_TO_SYMBOL_LOG_SAMPLE", ""))
+        _sampling_filter.rates = dict(sample_rates)
 
 logger = logging.getLogger(__name__)
@@ -1,21 +1,94 @@
 import argparse
+import atexit
+import csv
+import inspect
 import sys
 import os
-import copy
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from spec_to_symbol.library_manager import LibraryManager
+from spec_to_symbol.library_manager import LibraryManager, ShardedLibraryManager
 from spec_to_symbol.component import COMPONENT_MAP
-from spec_to_symbol.kicad_symbol import KiCadSymbol
+from spec_to_symbol.kicad_version import KICAD_VERSIONS
+from spec_to_symbol.template_library import TemplateLibrary, build_symbol
+from spec_to_symbol.validator import check_libraries, diff_libraries
 from spec_to_symbol.fuzzy import footprint_finder
+from spec_to_symbol.profiler import profiler
+from spec_to_symbol.logger import configure_logging
 from spec_to_symbol.tui.tui import run_tui
 
+def report_profile(json_path):
+    print(profiler.summary(), file=sys.stderr)
+    profiler.dump_json(json_path)
+    print(f"Profile written to {json_path}", file=sys.stderr)
+
+def read_batch(batch_path):
+    """
+    Reads a CSV import with a component_type and mpn column per row, plus any of
+    package, lcsc and the component's own fields. Every row is validated before
+    anything is built; problems are raised as one ValueError naming each row.
+    """
+    with open(batch_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    errors = []
+    for line, row in enumerate(rows, start=2): # Line 1 is the header.
+        component_type = row.get("component_type")
+        if component_type not in COMPONENT_MAP:
+            errors.append(f"row {line}: unknown component_type {component_type!r} (choose from {', '.join(COMPONENT_MAP)})")
+            continue
+        component_class, _ = COMPONENT_MAP[component_type]
+        required = [
+            name for name, param in inspect.signature(component_class.__init__).parameters.items()
+            if name != "self" and param.kind is param.POSITIONAL_OR_KEYWORD and param.default is param.empty
+        ]
+        missing = [name for name in ["mpn"] + required if not row.get(name)]
+        if missing:
+            errors.append(f"row {line}: missing {', '.join(missing)}")
+    if errors:
+        raise ValueError(f"{batch_path}:\n  " + "\n  ".join(errors))
+    return rows
+
+def build_batch_components(rows, min_score):
+    """
+    Builds a component per batch row. Package strings that are not exact footprint
+    names are resolved per component family, in one batch per family, against that
+    family's footprint libraries; matches below min_score keep the raw string.
+    """
+    known = set(footprint_finder.footprints)
+    resolved = {}
+    for component_type in dict.fromkeys(row["component_type"] for row in rows):
+        component_class, _ = COMPONENT_MAP[component_type]
+        loose_packages = [row.get("package") for row in rows
+                          if row["component_type"] == component_type and row.get("package") not in known]
+        matches = footprint_finder.resolve(loose_packages, libraries=component_class.footprint_libraries, min_score=min_score)
+        for query, (footprint, score) in matches.items():
+            if footprint is None:
+                print(f"Warning: no {component_type} footprint matches package {query!r} well enough "
+                      f"(best {score:.0f}% < {min_score}%); keeping it as is.", file=sys.stderr)
+            else:
+                print(f"Package {query!r} ({component_type}) -> {footprint} ({score:.0f}%)")
+            resolved[(component_type, query)] = footprint
+
+    components = []
+    for row in rows:
+        component_class, field_keys = COMPONENT_MAP[row["component_type"]]
+        kwargs = {key: row[key] for key in field_keys if row.get(key)}
+        package = row.get("package")
+        kwargs['mpn'] = row["mpn"]
+        kwargs['package'] = resolved.get((row["component_type"], package)) or package
+        kwargs['lcsc'] = row.get("lcsc") or None
+        components.append(component_class(**kwargs))
+    return components
+
 def main():
     parser = argparse.ArgumentParser(description="Create KiCad symbols for passive components.")
     parser.add_argument("--cli", action="store_true", help="Run in command-line mode.")
+    parser.add_argument("--check", nargs="+", metavar="LIBRARY", help="Validate symbol libraries (files or sharded directories) and exit.")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="Compare two symbol libraries (files or sharded directories) by symbol name and exit.")
+    parser.add_argument("--jobs", type=int, help="Worker processes for --check (default: one per CPU).")
     parser.add_argument("component_type", nargs="?", choices=COMPONENT_MAP.keys(), help="Type of component template to use.")
     # Generic arguments
     parser.add_argument("--mpn", help="Manufacturer Part Number.")
@@ -30,45 +103,92 @@ def main():
     parser.add_argument("--current", type=str, help="Inductor/Fuse current.")
     parser.add_argument("--color", type=str, help="LED color.")
     parser.add_argument("--impedance", type=str, help="Ferrite Bead impedance.")
+    parser.add_argument("--batch", metavar="CSV", help="Create one symbol per row of a CSV file (CLI mode).")
+    parser.add_argument("--min-score", type=float, default=80, help="Minimum fuzzy score for --batch to replace a package with a footprint (default: 80).")
     # Config
     parser.add_argument("--footprint-dir", default="/usr/share/kicad/footprints", help="KiCad footprint directory.")
-    parser.add_argument("--library", default="libraries/Passives.kicad_sym", help="Output symbol library.")
-    parser.add_argument("--template-library", default="symbol_templates/Device.kicad_sym", help="Template symbol library.")
+    parser.add_argument("--library", help="Output symbol library (a directory when --shard-by is set).")
+    parser.add_argument("--shard-by", choices=ShardedLibraryManager.SHARD_STRATEGIES, help="Split the output library into one file per template or name prefix.")
+    parser.add_argument("--template-library", action="append", help="Template symbol library; repeat to search several in order (default: the bundled Device and Template_Device libraries).")
+    parser.add_argument("--kicad-version", choices=KICAD_VERSIONS.keys(), help="KiCad release whose file format the output library is written in (default: keep an existing library's format, KiCad 9 for new ones).")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper, help="debug.log level (default: $SPEC_TO_SYMBOL_LOG_LEVEL or INFO).")
+    parser.add_argument("--profile", nargs="?", const="profile.json", metavar="JSON", help="Time pipeline stages; print a summary on exit and dump it to JSON (default: profile.json).")
 
     args = parser.parse_args()
+    if args.library is None:
+        args.library = "libraries/Passives" if args.shard_by else "libraries/Passives.kicad_sym"
+
+    configure_logging(level=args.log_level)
+
+    if args.profile:
+        profiler.enabled = True
+        atexit.register(report_profile, args.profile)
+
+    if args.check:
+        footprint_finder.footprint_dir = args.footprint_dir
+        footprint_finder.scan()
+        if not footprint_finder.footprints:
+            print("No footprints found; skipping footprint reference checks.", file=sys.stderr)
+        try:
+            issues = check_libraries(args.check, footprint_finder.footprints, workers=args.jobs)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        for library_path, name, issue in issues:
+            print(f"{library_path}: {name}: {issue}")
+        print(f"{len(issues)} issue(s) found.")
+        sys.exit(1 if issues else 0)
+
+    if args.diff:
+        try:
+            added, removed, changed = diff_libraries([args.diff[0]], [args.diff[1]])
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        for name in added:
+            print(f"+ {name}")
+        for name in removed:
+            print(f"- {name}")
+        for name, differences in changed.items():
+            print(f"~ {name}")
+            for difference in differences:
+                print(f"    {difference}")
+        sys.exit(1 if added or removed or changed else 0)
 
     if args.cli:
-        if not all([args.component_type, args.mpn]):
+        if not args.batch and not all([args.component_type, args.mpn]):
             parser.error("component_type and mpn are required in CLI mode.")
+        if args.batch:
+            try:
+                batch_rows = read_batch(args.batch)
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
         
         footprint_finder.footprint_dir = args.footprint_dir
         footprint_finder.scan()
 
-        component_class, field_keys = COMPONENT_MAP[args.component_type]
-        kwargs = {key: getattr(args, key) for key in field_keys if hasattr(args, key)}
-        kwargs['mpn'] = args.mpn
-        kwargs['package'] = args.package
-        kwargs['lcsc'] = args.lcsc
-        
-        component = component_class(**kwargs)
-
-        template_library = LibraryManager(args.template_library)
-        template_symbol = template_library.symbols[component.template_name]
-
-        new_symbol = KiCadSymbol(
-            component.mpn, copy.deepcopy(template_symbol.properties), template_symbol.pins,
-            template_symbol.graphics, template_symbol.attributes, template_name=template_symbol.name
-        )
+        if args.batch:
+            components = build_batch_components(batch_rows, args.min_score)
+        else:
+            component_class, field_keys = COMPONENT_MAP[args.component_type]
+            kwargs = {key: getattr(args, key) for key in field_keys if hasattr(args, key)}
+            kwargs['mpn'] = args.mpn
+            kwargs['package'] = args.package
+            kwargs['lcsc'] = args.lcsc
+            components = [component_class(**kwargs)]
 
-        for key, value in component.get_properties().items():
-            new_symbol.set_property(key, value)
-        new_symbol.ensure_hidden_properties()
+        template_library = TemplateLibrary(args.template_library)
 
-        library = LibraryManager(args.library)
-        library.add_symbol(new_symbol)
+        target_version = KICAD_VERSIONS[args.kicad_version] if args.kicad_version else None
+        if args.shard_by:
+            library = ShardedLibraryManager(args.library, shard_by=args.shard_by, target_version=target_version)
+        else:
+            library = LibraryManager(args.library, target_version)
+        new_symbols = [build_symbol(component, template_library) for component in components]
+        for new_symbol in new_symbols:
+            library.add_symbol(new_symbol)
         library.save_library()
 
-        print(f"Symbol {new_symbol.name} added to {args.library}")
+        for new_symbol in new_symbols:
+            print(f"Symbol {new_symbol.name} added to {args.library}")
     else:
         run_tui()
 
@@ -0,0 +1,103 @@
+import json
+import time
+
+class _NullSpan:
+    """Shared no-op span handed out while profiling is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class SpanStats:
+    """Count, total, min/max and a power-of-two microsecond histogram for one span name."""
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = {}
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min: self.min = seconds
+        if seconds > self.max: self.max = seconds
+        # Bucket upper bound in microseconds: 1, 2, 4, 8, ...
+        bucket = 1 << max(int(seconds * 1e6), 0).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "min_s": self.min if self.count else 0.0,
+            "max_s": self.max,
+            "histogram_us": {f"<{upper}": n for upper, n in sorted(self.buckets.items())},
+        }
+
+class _Span:
+    __slots__ = ("_profiler", "_name", "_stats", "_start")
+
+    def __init__(self, profiler, name, stats):
+        self._profiler = profiler
+        self._name = name
+        self._stats = stats
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self._start
+        self._stats.record(elapsed)
+        self._profiler.last = (self._name, elapsed)
+        return False
+
+class Profiler:
+    """
+    Aggregates timing spans around the pipeline stages. While disabled, span()
+    returns a shared no-op context manager so instrumented code pays only for
+    the attribute check.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.last = None
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = SpanStats()
+        return _Span(self, name, stats)
+
+    def summary(self):
+        """Returns a plain-text table of all spans, slowest total first."""
+        lines = [f"{'span':<20} {'count':>8} {'total ms':>10} {'mean ms':>10} {'max ms':>10}"]
+        for name, stats in sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True):
+            mean = stats.total / stats.count if stats.count else 0.0
+            lines.append(f"{name:<20} {stats.count:>8} {stats.total * 1e3:>10.2f} {mean * 1e3:>10.3f} {stats.max * 1e3:>10.3f}")
+        return "\n".join(lines)
+
+    def status_line(self):
+        """Returns a one-line view of the most recent span and its running average."""
+        if self.last is None:
+            return "profile: no spans recorded"
+        name, elapsed = self.last
+        stats = self.stats[name]
+        return f"profile: {name} {elapsed * 1e3:.2f}ms (n={stats.count}, avg {stats.total / stats.count * 1e3:.2f}ms)"
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump({name: self.stats[name].to_dict() for name in sorted(self.stats)}, f, indent=2)
+
+profiler = Profiler()
@@ -34,6 +34,10 @@ def _atom(token):
     """Converts a token to an int, float, string literal, or SexpAtom."""
     if len(token) > 1 and token.startswith('"') and token.endswith('"'):
         return token[1:-1].replace('\"', '"')
+    # Keywords are by far the most common tokens; skip the failing int/float
+    # conversions for anything that cannot be a number.
+    if token[0].isalpha() and token.lower() not in ("inf", "nan", "infinity"):
+        return SexpAtom(token)
     try:
         return int(token)
     except ValueError:
@@ -65,14 +69,17 @@ def build_sexp(ast, indent=0):
     first_line = indent_str + "(" + build_sexp(ast[0])
     remaining_items = ast[1:]
     
-    # If the second item is not a list, put it on the first line too.
-    if len(ast) > 1 and not isinstance(ast[1], list):
-        first_line += " " + build_sexp(ast[1])
-        remaining_items = ast[2:]
+    # Leading atoms (e.g. `pin passive line`) stay on the first line too.
+    while remaining_items and not isinstance(remaining_items[0], list):
+        first_line += " " + build_sexp(remaining_items[0])
+        remaining_items = remaining_items[1:]
 
     result = [first_line]
     for item in remaining_items:
-        result.append(build_sexp(item, indent + 1))
+        if isinstance(item, list):
+            result.append(build_sexp(item, indent + 1))
+        else:
+            result.append("  " * (indent + 1) + build_sexp(item))
     
     result.append(indent_str + ")")
     return "\n".join(result)
\ No newline at end of file
@@ -0,0 +1,58 @@
+from spec_to_symbol.kicad_symbol import KiCadSymbol
+from spec_to_symbol.library_manager import LibraryManager
+from spec_to_symbol.profiler import profiler
+import copy
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TEMPLATE_LIBRARIES = [
+    os.path.join(project_root, "symbol_templates", "Device.kicad_sym"),
+    os.path.join(project_root, "symbol_templates", "Template_Device.kicad_sym"),
+]
+
+class TemplateLibrary:
+    """
+    Several template libraries behind one lookup. When a name exists in more
+    than one library, the first library in the list wins. Libraries are only
+    indexed once a lookup reaches them, and symbols are parsed on access, so
+    large template sets cost nothing until they are needed.
+    """
+    def __init__(self, library_paths=None):
+        self.library_paths = list(library_paths or DEFAULT_TEMPLATE_LIBRARIES)
+        self._libraries = [None] * len(self.library_paths)
+
+    def _library(self, index):
+        if self._libraries[index] is None:
+            self._libraries[index] = LibraryManager(self.library_paths[index])
+        return self._libraries[index]
+
+    def _find(self, name):
+        for index in range(len(self.library_paths)):
+            library = self._library(index)
+            if name in library.symbols:
+                return library
+        return None
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def __getitem__(self, name):
+        library = self._find(name)
+        if library is None:
+            raise KeyError(f"Template symbol not found: {name}")
+        return library.symbols[name]
+
+def build_symbol(component, template_library):
+    """Creates a component's symbol from its template in template_library."""
+    template_symbol = template_library[component.template_name]
+    with profiler.span("symbol_build"):
+        new_symbol = KiCadSymbol(
+            component.mpn, copy.deepcopy(template_symbol.properties), template_symbol.pins,
+            template_symbol.graphics, template_symbol.attributes, template_name=template_symbol.name
+        )
+
+        for key, value in component.get_properties().items():
+            new_symbol.set_property(key, value)
+        new_symbol.ensure_hidden_properties()
+    return new_symbol
@@ -2,17 +2,17 @@ from spec_to_symbol.tui.terminal import Terminal
 from spec_to_symbol.component import COMPONENT_MAP
 from spec_to_symbol.fuzzy import footprint_finder
 from spec_to_symbol.library_manager import LibraryManager
-from spec_to_symbol.kicad_symbol import KiCadSymbol
-from spec_to_symbol.logger import logger
-import copy
+from spec_to_symbol.template_library import TemplateLibrary, build_symbol
+from spec_to_symbol.logger import logger, configure_logging
+from spec_to_symbol.profiler import profiler
 import os
 
 class SpecToSymbolTUI:
     def __init__(self):
         self.active = True
         self.mode = "nav_tabs"
-        self.template_library = LibraryManager("symbol_templates/Device.kicad_sym")
-        self.component_types = [name for name in COMPONENT_MAP.keys() if name in self.template_library.symbols]
+        self.template_library = TemplateLibrary()
+        self.component_types = [name for name in COMPONENT_MAP.keys() if name in self.template_library]
         self.tab_selection = 0
         self.form_selection = 0
         self.form_data = {}
@@ -22,6 +22,7 @@ class SpecToSymbolTUI:
         self.dialog_message = None
         self.last_key = ""
         self.just_entered_insert = False
+        self.show_profile = False
         self.setup_form()
 
     def setup_form(self):
@@ -41,7 +42,7 @@ class SpecToSymbolTUI:
         }
 
     def handle_key(self, key):
-        logger.debug(f"Key: {key!r}, Mode: {self.mode}")
+        logger.debug("Key: %r, Mode: %s", key, self.mode, extra={"category": "key"})
         if self.dialog_message:
             self.dialog_message = None
             return
@@ -50,6 +51,10 @@ class SpecToSymbolTUI:
             self.active = False
             return
 
+        if key == 'P' and self.mode != "insert" and profiler.enabled:
+            self.show_profile = not self.show_profile
+            return
+
         if self.mode == "nav_tabs":
             if key == 'l': self.tab_selection = (self.tab_selection + 1) % len(self.component_types)
             elif key == 'h': self.tab_selection = (self.tab_selection - 1 + len(self.component_types)) % len(self.component_types)
@@ -79,7 +84,9 @@ class SpecToSymbolTUI:
             field_name = self.form_fields[self.form_selection]
             if key == '\x1b': self.mode = "nav_form"; self.completions = []
             elif key == '\r':
-                if self.completion_selection != -1: self.form_data[field_name] = self.completions[self.completion_selection]
+                if self.completion_selection != -1:
+                    self.form_data[field_name] = self.completions[self.completion_selection]
+                    footprint_finder.history.record(self.form_data[field_name])
                 self.mode = "nav_form"; self.completions = []
             elif key == '\x7f': 
                 if self.form_data[field_name]: self.form_data[field_name] = self.form_data[field_name][:-1]
@@ -118,14 +125,7 @@ class SpecToSymbolTUI:
         self.mode = "nav_tabs"
 
     def create_symbol(self, component, library_path="libraries/Passives.kicad_sym"):
-        template_symbol = self.template_library.symbols[component.template_name]
-        new_symbol = KiCadSymbol(
-            component.mpn, copy.deepcopy(template_symbol.properties), template_symbol.pins,
-            template_symbol.graphics, template_symbol.attributes, template_name=template_symbol.name
-        )
-        for key, value in component.get_properties().items():
-            new_symbol.set_property(key, value)
-        new_symbol.ensure_hidden_properties()
+        new_symbol = build_symbol(component, self.template_library)
         library = LibraryManager(library_path)
         library.add_symbol(new_symbol)
         library.save_library()
@@ -187,19 +187,25 @@ class SpecToSymbolTUI:
             term.move_cursor(start_row + 3, start_col + (box_width - len(message)) // 2); term.write(message)
         footer_text = "[h/l] Tabs | [j/k] Form | [i] Insert | [dd] Clear | [enter] Select/Submit | [q] Quit"
         term.move_cursor(rows, 1); term.set_color(fg=255, bg=57); term.write(footer_text.ljust(cols)); term.reset_color()
+        if self.show_profile:
+            term.move_cursor(rows - 1, 1); term.set_color(fg=244); term.write(profiler.status_line()[:cols].ljust(cols)); term.reset_color()
         if self.mode == "insert":
             cursor_row = form_start_row + self.form_selection + 1
             cursor_col = form_start_col + 15 + len(self.form_data.get(self.form_fields[self.form_selection], ''))
             term.move_cursor(cursor_row, cursor_col); term.show_cursor()
 
     def run(self):
-        with Terminal() as term:
-            while self.active:
-                self.draw(term)
-                key = term.get_key()
-                self.handle_key(key)
+        try:
+            with Terminal() as term:
+                while self.active:
+                    self.draw(term)
+                    key = term.get_key()
+                    self.handle_key(key)
+        finally:
+            footprint_finder.history.flush()
 
 def run_tui():
+    configure_logging()
     if not os.path.exists(footprint_finder.cache_path):
         print("First-time setup: Caching KiCad footprints for faster searching...")
     footprint_finder.scan()
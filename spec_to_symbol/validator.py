@@ -0,0 +1,160 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from spec_to_symbol.kicad_symbol import KiCadSymbol
+from spec_to_symbol.kicad_version import DEFAULT_KICAD_VERSION, convert_sexp
+from spec_to_symbol.library_manager import LibraryManager
+from spec_to_symbol.sexp_parser import parse_sexp, SexpAtom
+import multiprocessing
+import os
+
+# Footprint names known to the worker processes, set by _init_worker.
+_known_footprints = frozenset()
+
+def _init_worker(footprints):
+    global _known_footprints
+    _known_footprints = footprints
+
+def _property_value(symbol, key):
+    prop = symbol.properties.get(key)
+    return str(prop[2]) if prop and len(prop) > 2 else ""
+
+def check_footprint(symbol):
+    footprint = _property_value(symbol, "Footprint")
+    if _known_footprints and footprint and footprint not in _known_footprints:
+        yield f"unknown footprint {footprint!r}"
+
+def check_hidden(symbol):
+    for key in symbol.unhidden_properties():
+        yield f"property {key!r} is not hidden"
+
+def check_unit_names(symbol):
+    # from_sexp only treats `<name>_...` sub-symbols as units; any other nested
+    # symbol is a unit that was not renamed along with its parent.
+    for item in symbol.attributes:
+        if isinstance(item, list) and item and item[0] == SexpAtom("symbol"):
+            yield f"unit {item[1]!r} does not match symbol name"
+
+VALIDATORS = [check_footprint, check_hidden, check_unit_names]
+
+def _check_chunk(chunk):
+    results = []
+    for library_path, raw in chunk:
+        symbol = KiCadSymbol.from_sexp(parse_sexp(raw.decode("utf-8")))
+        issues = [issue for validator in VALIDATORS for issue in validator(symbol)]
+        results.append((library_path, symbol.name, _property_value(symbol, "MPN"), issues))
+    return results
+
+def _library_files(paths):
+    """
+    Expands directories (e.g. sharded libraries) to the .kicad_sym files inside
+    them. Raises FileNotFoundError for a path that does not exist.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".kicad_sym"))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Library not found: {path}")
+    return files
+
+def _chunks(library_files, chunk_size):
+    chunk = []
+    for library_path in library_files:
+        library = LibraryManager(library_path)
+        for _, raw in library.symbols.raw_items():
+            chunk.append((library_path, raw))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def check_libraries(library_paths, footprints=(), workers=None, chunk_size=200):
+    """
+    Runs every validator over each symbol of the given libraries in a process
+    pool, then reports MPNs used by more than one symbol.
+    Returns a list of (library_path, symbol_name, issue) tuples.
+    """
+    library_files = _library_files(library_paths)
+    workers = workers or os.cpu_count() or 1
+    issues = []
+    mpns = {}
+
+    def collect(results):
+        for library_path, name, mpn, symbol_issues in results:
+            issues.extend((library_path, name, issue) for issue in symbol_issues)
+            if mpn:
+                mpns.setdefault(mpn, []).append((library_path, name))
+
+    if workers == 1:
+        _init_worker(frozenset(footprints))
+        for chunk in _chunks(library_files, chunk_size):
+            collect(_check_chunk(chunk))
+    else:
+        # Never fork: the parent may be running the logging listener thread.
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method),
+                                 initializer=_init_worker, initargs=(frozenset(footprints),)) as executor:
+            # Keep a bounded number of chunks in flight so the libraries are streamed.
+            pending = []
+            for chunk in _chunks(library_files, chunk_size):
+                pending.append(executor.submit(_check_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    collect(pending.pop(0).result())
+            for future in pending:
+                collect(future.result())
+
+    for mpn, owners in mpns.items():
+        if len(owners) > 1:
+            for library_path, name in owners:
+                issues.append((library_path, name, f"duplicate MPN {mpn!r}"))
+    return issues
+
+def _diff_symbol(old_index, new_index, name):
+    """Returns the differences of one symbol between two libraries, or an empty list."""
+    if old_index.raw(name).split() == new_index.raw(name).split():
+        return []
+    common_version = min(old_index.version or DEFAULT_KICAD_VERSION, new_index.version or DEFAULT_KICAD_VERSION)
+    old_sexp = convert_sexp(old_index.sexp(name), common_version)
+    new_sexp = convert_sexp(new_index.sexp(name), common_version)
+    if old_sexp == new_sexp:
+        return []
+    old_symbol, new_symbol = KiCadSymbol.from_sexp(old_sexp), KiCadSymbol.from_sexp(new_sexp)
+    differences = []
+    for key in sorted(set(old_symbol.properties) | set(new_symbol.properties)):
+        old_value, new_value = _property_value(old_symbol, key), _property_value(new_symbol, key)
+        if key not in new_symbol.properties:
+            differences.append(f"-{key} {old_value!r}")
+        elif key not in old_symbol.properties:
+            differences.append(f"+{key} {new_value!r}")
+        elif old_value != new_value:
+            differences.append(f"{key}: {old_value!r} -> {new_value!r}")
+    return differences or ["graphics, pins or attributes differ"]
+
+def diff_libraries(old_paths, new_paths):
+    """
+    Matches symbols by name between two sets of libraries (files or sharded
+    directories). Returns (added, removed, changed) where changed maps a symbol
+    name to a list of human-readable differences. Symbols whose text differs
+    beyond whitespace are parsed and converted to a common file format version
+    before comparing, so a library rewritten in another format shows no changes.
+    """
+    old_libraries = [LibraryManager(path).symbols for path in _library_files(old_paths)]
+    new_libraries = [LibraryManager(path).symbols for path in _library_files(new_paths)]
+    with ExitStack() as stack:
+        # Keep every file mapped for the comparison instead of mapping it per symbol.
+        for symbols in old_libraries + new_libraries:
+            stack.enter_context(symbols.mapped())
+        old = {name: symbols for symbols in old_libraries for name in symbols}
+        new = {name: symbols for symbols in new_libraries for name in symbols}
+        added = sorted(name for name in new if name not in old)
+        removed = sorted(name for name in old if name not in new)
+
+        changed = {}
+        for name in sorted(name for name in new if name in old):
+            differences = _diff_symbol(old[name], new[name], name)
+            if differences:
+                changed[name] = differences
+    return added, removed, changed